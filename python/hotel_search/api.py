@@ -1,81 +1,282 @@
 from fastapi import FastAPI, Query
 from datetime import date, timedelta
 from typing import List, Optional
-from bitarray import bitarray
-import asyncio
-from redis_shards import get_redis_for_city, bitmap_from_key
+import hashlib
+import math
+import operator
+import os
+import uuid
+from functools import reduce
+from itertools import islice
+import h3
+import numpy as np
+from bitops import and_reduce
+from db import async_session
+from models import AMENITY_BITS, criteria_fields
+from sqlalchemy import text
+from redis_shards import (
+    CACHE_VERSION_KEY,
+    H3_RESOLUTION,
+    ROARING,
+    amenity_key,
+    city_key,
+    geo_key,
+    get_redis,
+    guests_ge_key,
+    h3_key,
+    init_redis,
+)
+
+if ROARING:
+    from pyroaring import BitMap
 
 app = FastAPI()
 
-criteria_fields = [
-    "has_pool","has_bar","smoking_allowed","has_wifi","has_gym","has_spa","has_parking",
-    "has_aircon","has_kitchen","has_balcony","pet_friendly","near_beach","near_airport",
-    "family_friendly","romantic","business_ready","breakfast_included","free_cancellation",
-    "early_checkin","late_checkout","wheelchair_accessible","tv","minibar","room_service","non_smoking_rooms"
-]
 
-@get("/search")
-async def search_properties(
+@app.on_event("startup")
+async def _startup():
+    # RedisCluster.__init__ does no I/O; initialize() runs cluster discovery
+    # and builds the connection pools so the first search does not pay them
+    await init_redis().initialize()
+
+# Server-side BITOP pushdown keeps the intersection inside redis-server and
+# transfers only the final bitmap. Set SEARCH_BITOP_PUSHDOWN=0 to fall back
+# to fetching the bitmaps and intersecting client-side via bitops.
+BITOP_PUSHDOWN = os.getenv("SEARCH_BITOP_PUSHDOWN", "1") == "1"
+TMP_KEY_TTL = 60  # seconds
+
+# Popular searches repeat, so the intersected bitmap is kept for a short TTL
+# keyed by a hash of the query. Indexing bumps CACHE_VERSION_KEY, which is
+# part of every cache key, so stale entries are never served.
+CACHE_TTL = 60  # seconds
+
+
+def _cache_key(city, ver, *args) -> str:
+    digest = hashlib.blake2b(repr(args).encode(), digest_size=12).hexdigest()
+    return f"cache:search:{{{city}}}:v{ver}:{digest}"
+
+
+async def _cache_version(redis_client) -> int:
+    ver = await redis_client.get(CACHE_VERSION_KEY)
+    return int(ver) if ver else 0
+
+
+def _cells_for_radius(lat: float, lon: float, radius_miles: float):
+    """H3 cells whose precomputed bitmaps cover the search radius.
+
+    Res-7 hexagons have ~1.2km edges, so neighbouring cell centers are
+    ~2.1km apart; one grid_disk ring covers roughly that much extra radius.
+    """
+    radius_km = radius_miles * 1.609
+    k = max(1, math.ceil(radius_km / 2.1))
+    return h3.grid_disk(h3.latlng_to_cell(lat, lon, H3_RESOLUTION), k)
+
+
+def ids_from_buffer(buffer: bytes) -> List[int]:
+    """Extract the 1-based property ids of the set bits in a raw bitmap.
+
+    Redis SETBIT is MSB-first within each byte, which matches
+    unpackbits(bitorder='big').
+    """
+    bits = np.unpackbits(np.frombuffer(buffer, dtype=np.uint8), bitorder="big")
+    return (np.flatnonzero(bits) + 1).tolist()
+
+
+async def _first_ids_and_total(redis_client, dest, limit):
+    """Page through the result bitmap server-side: one BITPOS per returned id
+    plus one BITCOUNT, instead of transferring and scanning the whole bitmap."""
+    ids = []
+    pos = -1
+    for _ in range(limit):
+        pos = await redis_client.bitpos(dest, 1, pos + 1, -1, "bit")
+        if pos is None or pos < 0:
+            break
+        ids.append(pos + 1)
+    total = await redis_client.bitcount(dest)
+    return ids, total
+
+
+def _geo_buffer(geo_ids) -> bytes:
+    """Build a raw bitmap buffer from a list of property ids."""
+    max_pid = max([int(pid) for pid in geo_ids])
+    geo_bits = np.zeros(((max_pid + 7) // 8) * 8, dtype=np.uint8)
+    for pid in geo_ids:
+        geo_bits[int(pid) - 1] = 1
+    return np.packbits(geo_bits, bitorder="big").tobytes()
+
+
+async def _search_server_side(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit):
+    # Identical queries within the TTL reuse the materialized bitmap
+    ver = await _cache_version(redis_client)
+    cache_key = _cache_key(city, ver, city, sorted(amenities or []), min_guests, lat, lon, radius_miles)
+    if await redis_client.exists(cache_key):
+        ids, total = await _first_ids_and_total(redis_client, cache_key, limit)
+        return {"properties": ids, "total": total}
+
+    keys = [city_key(city)]
+    token = uuid.uuid4().hex
+
+    # Guest count: the "at least N" union is materialized at index time
+    if min_guests:
+        keys.append(guests_ge_key(city, min_guests))
+
+    # Amenities
+    if amenities:
+        keys.extend(amenity_key(city, a) for a in amenities if a in criteria_fields)
+
+    # Geo: union the precomputed H3 cell bitmaps covering the radius - set
+    # ops only, no GEORADIUS scan per request
+    if lat is not None and lon is not None:
+        cells = _cells_for_radius(lat, lon, radius_miles)
+        tmp_geo = f"tmp:{{{city}}}:geo:{token}"
+        await redis_client.bitop("OR", tmp_geo, *[h3_key(city, c) for c in cells])
+        await redis_client.expire(tmp_geo, TMP_KEY_TTL)
+        keys.append(tmp_geo)
+
+    # The intersection lands directly in the cache key
+    dest = cache_key
+    await redis_client.bitop("AND", dest, *keys)
+    await redis_client.expire(dest, CACHE_TTL)
+
+    # Only the first page of ids and the count ever leave the server
+    ids, total = await _first_ids_and_total(redis_client, dest, limit)
+    return {"properties": ids, "total": total}
+
+
+async def _search_client_side(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit):
+    # Fetch every bitmap in one pipelined round-trip instead of one GET per
+    # key (the cluster client batches the queued GETs per node)
+    guest_keys = [guests_ge_key(city, min_guests)] if min_guests else []
+    amenity_keys = [amenity_key(city, a) for a in amenities if a in criteria_fields] if amenities else []
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in [city_key(city)] + guest_keys + amenity_keys:
+            pipe.get(key)
+        raw = await pipe.execute()
+
+    buffers = []
+
+    # City bitmap
+    if raw[0]:
+        buffers.append(raw[0])
+
+    # Guest count (single precomputed "ge" bitmap)
+    if guest_keys and raw[1]:
+        buffers.append(raw[1])
+
+    # Amenities
+    buffers.extend(buf for buf in raw[1 + len(guest_keys):] if buf)
+
+    # Geo
+    if lat is not None and lon is not None:
+        geo_ids = await redis_client.georadius(geo_key(city), lon, lat, radius_miles, unit="mi")
+        if geo_ids:
+            buffers.append(_geo_buffer(geo_ids))
+
+    if not buffers:
+        return {"properties": [], "total": 0}
+
+    # Intersect all bitmaps in one vectorized pass
+    result = and_reduce(buffers)
+
+    ids = ids_from_buffer(result)
+    return {"properties": ids[:limit], "total": len(ids)}
+
+
+async def _search_roaring(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit):
+    # Roaring blobs cannot join a server-side BITOP, but they are tiny for
+    # sparse sets, so fetching and intersecting client-side wins there
+    guest_keys = [guests_ge_key(city, min_guests)] if min_guests else []
+    amenity_keys = [amenity_key(city, a) for a in amenities if a in criteria_fields] if amenities else []
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key in [city_key(city)] + guest_keys + amenity_keys:
+            pipe.get(key)
+        raw = await pipe.execute()
+
+    maps = [BitMap.deserialize(data) for data in raw if data]
+
+    # Geo
+    if lat is not None and lon is not None:
+        geo_ids = await redis_client.georadius(geo_key(city), lon, lat, radius_miles, unit="mi")
+        if not geo_ids:
+            return {"properties": [], "total": 0}
+        maps.append(BitMap(int(pid) for pid in geo_ids))
+
+    if not maps:
+        return {"properties": [], "total": 0}
+
+    # Roaring blobs hold the property ids directly - no bit unpacking needed
+    result = reduce(operator.and_, maps)
+    return {"properties": list(islice(result, limit)), "total": len(result)}
+
+
+@app.get("/search/sql")
+async def search_properties_sql(
     city: str,
     min_guests: Optional[int] = None,
     amenities: Optional[List[str]] = Query(None),
-    checkin: Optional[date] = None,
-    checkout: Optional[date] = None,
     lat: Optional[float] = None,
     lon: Optional[float] = None,
-    radius_miles: Optional[float] = 10
+    radius_miles: Optional[float] = 10,
+    limit: int = 20
 ):
-    redis_client = await get_redis_for_city(city)
-    bitmaps = []
-
-    # City bitmap
-    city_ba = await bitmap_from_key(redis_client, f"bitmap:city:{city}")
-    if city_ba:
-        bitmaps.append(city_ba)
+    """SQL fallback: the same filters straight against Postgres, served by
+    the (city, max_guests), amenities and (latitude, longitude) indexes.
+    No Redis ingest lag, no bitmap materialization."""
+    clauses = ["city = :city"]
+    params = {"city": city, "limit": limit}
 
-    # Guest count
     if min_guests:
-        guest_bitmaps = []
-        for g in range(min_guests, 7):
-            ba_g = await bitmap_from_key(redis_client, f"bitmap:max_guests:{g}")
-            if ba_g:
-                guest_bitmaps.append(ba_g)
-        if guest_bitmaps:
-            ba_union = guest_bitmaps[0].copy()
-            for b in guest_bitmaps[1:]:
-                ba_union |= b
-            bitmaps.append(ba_union)
+        clauses.append("max_guests >= :min_guests")
+        params["min_guests"] = min_guests
 
-    # Amenities
-    if amenities:
-        amenity_bitmaps = await asyncio.gather(*[
-            bitmap_from_key(redis_client, f"bitmap:amenity:{a}")
-            for a in amenities if a in criteria_fields
-        ])
-        for ba in amenity_bitmaps:
-            if ba:
-                bitmaps.append(ba)
+    mask = 0
+    for a in amenities or []:
+        mask |= AMENITY_BITS.get(a, 0)
+    if mask:
+        clauses.append("amenities & :mask = :mask")
+        params["mask"] = mask
+
+    if lat is not None and lon is not None:
+        # Bounding-box approximation of the radius (1 deg lat ~= 69 miles)
+        lat_delta = radius_miles / 69.0
+        lon_delta = radius_miles / (69.0 * max(math.cos(math.radians(lat)), 0.01))
+        clauses.append("latitude BETWEEN :lat_lo AND :lat_hi")
+        clauses.append("longitude BETWEEN :lon_lo AND :lon_hi")
+        params.update(lat_lo=lat - lat_delta, lat_hi=lat + lat_delta,
+                      lon_lo=lon - lon_delta, lon_hi=lon + lon_delta)
+
+    sql = (
+        "SELECT id, count(*) OVER () AS total FROM properties WHERE "
+        + " AND ".join(clauses)
+        + " ORDER BY id LIMIT :limit"
+    )
+    async with async_session() as session:
+        rows = (await session.execute(text(sql), params)).all()
+
+    return {"properties": [r[0] for r in rows], "total": rows[0][1] if rows else 0}
+
+
+@app.get("/search")
+async def search_properties(
+    city: str,
+    min_guests: Optional[int] = None,
+    amenities: Optional[List[str]] = Query(None),
+    checkin: Optional[date] = None,
+    checkout: Optional[date] = None,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_miles: Optional[float] = 10,
+    limit: int = 20
+):
+    redis_client = get_redis()
 
     # Availability (optional, dummy for now)
     # Add similar logic for dates if needed
 
-    # Geo
-    if lat is not None and lon is not None:
-        geo_ids = await redis_client.georadius(f"geo:{city}", lon, lat, radius_miles, unit="mi")
-        if geo_ids:
-            max_pid = max([int(pid) for pid in geo_ids])
-            geo_ba = bitarray(max_pid)
-            geo_ba.setall(0)
-            for pid in geo_ids:
-                geo_ba[int(pid)-1] = 1
-            bitmaps.append(geo_ba)
-
-    if not bitmaps:
-        return {"properties": []}
-
-    # Intersect all bitmaps
-    result = bitmaps[0].copy()
-    for b in bitmaps[1:]:
-        result &= b
-
-    return {"properties": [i+1 for i, bit in enumerate(result) if bit]}
+    if ROARING:
+        return await _search_roaring(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit)
+    if BITOP_PUSHDOWN:
+        return await _search_server_side(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit)
+    return await _search_client_side(redis_client, city, min_guests, amenities, lat, lon, radius_miles, limit)
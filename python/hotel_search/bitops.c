@@ -0,0 +1,135 @@
+/*
+ * SIMD kernels for the bitmap AND/OR hot path in the hotel search.
+ *
+ * Each kernel folds `src` into `dst` in place over `n` bytes. Callers are
+ * expected to pass 64-byte padded buffers (the Python wrapper does this),
+ * but a scalar tail handles ragged lengths anyway.
+ *
+ * Dispatch is done once per call via __builtin_cpu_supports, so the same
+ * binary uses AVX-512 / AVX2 / scalar depending on the host CPU.
+ */
+#include <stdint.h>
+#include <stddef.h>
+
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+
+__attribute__((target("avx2")))
+static void and_avx2(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    /* 4x unrolled: 128 bytes per iteration */
+    for (; i + 128 <= n; i += 128) {
+        __m256i a0 = _mm256_loadu_si256((const __m256i *)(dst + i));
+        __m256i a1 = _mm256_loadu_si256((const __m256i *)(dst + i + 32));
+        __m256i a2 = _mm256_loadu_si256((const __m256i *)(dst + i + 64));
+        __m256i a3 = _mm256_loadu_si256((const __m256i *)(dst + i + 96));
+        __m256i b0 = _mm256_loadu_si256((const __m256i *)(src + i));
+        __m256i b1 = _mm256_loadu_si256((const __m256i *)(src + i + 32));
+        __m256i b2 = _mm256_loadu_si256((const __m256i *)(src + i + 64));
+        __m256i b3 = _mm256_loadu_si256((const __m256i *)(src + i + 96));
+        _mm256_storeu_si256((__m256i *)(dst + i), _mm256_and_si256(a0, b0));
+        _mm256_storeu_si256((__m256i *)(dst + i + 32), _mm256_and_si256(a1, b1));
+        _mm256_storeu_si256((__m256i *)(dst + i + 64), _mm256_and_si256(a2, b2));
+        _mm256_storeu_si256((__m256i *)(dst + i + 96), _mm256_and_si256(a3, b3));
+    }
+    for (; i < n; i++)
+        dst[i] &= src[i];
+}
+
+__attribute__((target("avx2")))
+static void or_avx2(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    for (; i + 128 <= n; i += 128) {
+        __m256i a0 = _mm256_loadu_si256((const __m256i *)(dst + i));
+        __m256i a1 = _mm256_loadu_si256((const __m256i *)(dst + i + 32));
+        __m256i a2 = _mm256_loadu_si256((const __m256i *)(dst + i + 64));
+        __m256i a3 = _mm256_loadu_si256((const __m256i *)(dst + i + 96));
+        __m256i b0 = _mm256_loadu_si256((const __m256i *)(src + i));
+        __m256i b1 = _mm256_loadu_si256((const __m256i *)(src + i + 32));
+        __m256i b2 = _mm256_loadu_si256((const __m256i *)(src + i + 64));
+        __m256i b3 = _mm256_loadu_si256((const __m256i *)(src + i + 96));
+        _mm256_storeu_si256((__m256i *)(dst + i), _mm256_or_si256(a0, b0));
+        _mm256_storeu_si256((__m256i *)(dst + i + 32), _mm256_or_si256(a1, b1));
+        _mm256_storeu_si256((__m256i *)(dst + i + 64), _mm256_or_si256(a2, b2));
+        _mm256_storeu_si256((__m256i *)(dst + i + 96), _mm256_or_si256(a3, b3));
+    }
+    for (; i < n; i++)
+        dst[i] |= src[i];
+}
+
+__attribute__((target("avx512f")))
+static void and_avx512(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    for (; i + 64 <= n; i += 64) {
+        __m512i a = _mm512_loadu_si512((const void *)(dst + i));
+        __m512i b = _mm512_loadu_si512((const void *)(src + i));
+        _mm512_storeu_si512((void *)(dst + i), _mm512_and_si512(a, b));
+    }
+    for (; i < n; i++)
+        dst[i] &= src[i];
+}
+
+__attribute__((target("avx512f")))
+static void or_avx512(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    for (; i + 64 <= n; i += 64) {
+        __m512i a = _mm512_loadu_si512((const void *)(dst + i));
+        __m512i b = _mm512_loadu_si512((const void *)(src + i));
+        _mm512_storeu_si512((void *)(dst + i), _mm512_or_si512(a, b));
+    }
+    for (; i < n; i++)
+        dst[i] |= src[i];
+}
+#endif /* x86 */
+
+static void and_scalar(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    for (; i + 8 <= n; i += 8)
+        *(uint64_t *)(dst + i) &= *(const uint64_t *)(src + i);
+    for (; i < n; i++)
+        dst[i] &= src[i];
+}
+
+static void or_scalar(uint8_t *dst, const uint8_t *src, size_t n)
+{
+    size_t i = 0;
+    for (; i + 8 <= n; i += 8)
+        *(uint64_t *)(dst + i) |= *(const uint64_t *)(src + i);
+    for (; i < n; i++)
+        dst[i] |= src[i];
+}
+
+void bitvec_and(uint8_t *dst, const uint8_t *src, size_t n)
+{
+#if defined(__x86_64__) || defined(__i386__)
+    if (__builtin_cpu_supports("avx512f")) {
+        and_avx512(dst, src, n);
+        return;
+    }
+    if (__builtin_cpu_supports("avx2")) {
+        and_avx2(dst, src, n);
+        return;
+    }
+#endif
+    and_scalar(dst, src, n);
+}
+
+void bitvec_or(uint8_t *dst, const uint8_t *src, size_t n)
+{
+#if defined(__x86_64__) || defined(__i386__)
+    if (__builtin_cpu_supports("avx512f")) {
+        or_avx512(dst, src, n);
+        return;
+    }
+    if (__builtin_cpu_supports("avx2")) {
+        or_avx2(dst, src, n);
+        return;
+    }
+#endif
+    or_scalar(dst, src, n);
+}
@@ -0,0 +1,59 @@
+"""Bitmap AND/OR reductions over raw Redis bitmap bytes.
+
+Uses the _bitops C extension (AVX-512/AVX2 with runtime CPU dispatch,
+see bitops.c) when it has been built via `python bitops_build.py`, and
+falls back to numpy's vectorized reductions otherwise.
+"""
+from typing import List
+
+import numpy as np
+
+try:
+    from _bitops import ffi as _ffi, lib as _lib
+    HAVE_NATIVE = True
+except ImportError:
+    HAVE_NATIVE = False
+
+
+def _padded_width(buffers) -> int:
+    # Pad to 64 bytes so the AVX-512 kernels never hit the scalar tail.
+    width = max(len(b) for b in buffers)
+    return ((width + 63) // 64) * 64
+
+
+def _reduce_native(buffers, fold) -> bytes:
+    width = _padded_width(buffers)
+    acc = bytearray(width)
+    acc[:len(buffers[0])] = buffers[0]
+    dst = _ffi.from_buffer("uint8_t[]", acc, require_writable=True)
+    for b in buffers[1:]:
+        other = bytearray(width)
+        other[:len(b)] = b
+        fold(dst, _ffi.from_buffer("uint8_t[]", other), width)
+    return bytes(acc)
+
+
+def _stack_buffers(buffers):
+    width = _padded_width(buffers)
+    rows = [
+        np.pad(np.frombuffer(b, dtype=np.uint8), (0, width - len(b)))
+        for b in buffers
+    ]
+    return np.vstack(rows).view(np.uint64)
+
+
+def and_reduce(buffers: List[bytes]) -> bytes:
+    """Bitwise AND across raw bitmap buffers; shorter buffers are
+    zero-padded, so their missing tail bits intersect to 0."""
+    if HAVE_NATIVE:
+        return _reduce_native(buffers, _lib.bitvec_and)
+    res = np.bitwise_and.reduce(_stack_buffers(buffers), axis=0)
+    return res.view(np.uint8).tobytes()
+
+
+def or_reduce(buffers: List[bytes]) -> bytes:
+    """Bitwise OR across raw bitmap buffers."""
+    if HAVE_NATIVE:
+        return _reduce_native(buffers, _lib.bitvec_or)
+    res = np.bitwise_or.reduce(_stack_buffers(buffers), axis=0)
+    return res.view(np.uint8).tobytes()
@@ -0,0 +1,32 @@
+"""cffi build script for the _bitops extension.
+
+Build once with:
+
+    python bitops_build.py
+
+which produces _bitops.*.so next to bitops.py. bitops.py falls back to
+numpy if the extension has not been built.
+"""
+from cffi import FFI
+
+ffibuilder = FFI()
+
+ffibuilder.cdef("""
+void bitvec_and(uint8_t *dst, const uint8_t *src, size_t n);
+void bitvec_or(uint8_t *dst, const uint8_t *src, size_t n);
+""")
+
+ffibuilder.set_source(
+    "_bitops",
+    """
+    #include <stdint.h>
+    #include <stddef.h>
+    void bitvec_and(uint8_t *dst, const uint8_t *src, size_t n);
+    void bitvec_or(uint8_t *dst, const uint8_t *src, size_t n);
+    """,
+    sources=["bitops.c"],
+    extra_compile_args=["-O3"],
+)
+
+if __name__ == "__main__":
+    ffibuilder.compile(verbose=True)
@@ -5,10 +5,11 @@ from sqlalchemy.orm import sessionmaker
 POSTGRES_USER = os.getenv("POSTGRES_USER", "postgres")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "postgres123")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
+# Default matches the docker-compose port mapping
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5555")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "hotel_db")
 
-# Note postgres port is changed for docker-compose port .
-DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:5555/{POSTGRES_DB}"
+DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 engine = create_async_engine(DATABASE_URL, echo=False)
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
@@ -1,59 +1,105 @@
-import asyncio
+from collections import defaultdict
+
+import h3
 
-from bitarray import bitarray
 from db import async_session
-from models import Availability, Property
-from redis_shards import bitmap_from_key, get_redis
+from models import BIT_TO_NAME, Availability, Property
+from redis_shards import (
+    CACHE_VERSION_KEY,
+    H3_RESOLUTION,
+    ROARING,
+    amenity_key,
+    city_key,
+    geo_key,
+    get_redis,
+    guests_ge_key,
+    h3_key,
+)
 
+if ROARING:
+    from pyroaring import BitMap
+
+
+def _property_keys_and_id(property: Property):
+    """Yield (bitmap key, property id) pairs for every index this property
+    belongs to. Shared by the dense and roaring backends."""
+    yield city_key(property.city), property.id
+    for g in range(1, property.max_guests + 1):
+        yield guests_ge_key(property.city, g), property.id
+
+    # Amenities: walk only the set bits of the packed mask
+    mask = getattr(property, "amenities", 0) or 0
+    while mask:
+        bit = mask & -mask
+        yield amenity_key(property.city, BIT_TO_NAME[bit]), property.id
+        mask ^= bit
+
+    # Geo cell, so radius filters are pure set ops at query time
+    cell = h3.latlng_to_cell(property.latitude, property.longitude, H3_RESOLUTION)
+    yield h3_key(property.city, cell), property.id
 
-async def index_property_to_redis(property: Property):
-    redis_client = await get_redis()
-    # The bit offset is the ID - 1
-    offset = property.id - 1
 
+def _queue_property(pipe, property: Property):
+    """Queue the SETBIT/GEOADD commands for one property on a pipeline."""
+    for key, pid in _property_keys_and_id(property):
+        # The bit offset is the ID - 1; atomic bit updates - very fast
+        pipe.setbit(key, pid - 1, 1)
+
+    # GEO is the only "heavy" part
+    pipe.geoadd(geo_key(property.city), [property.longitude, property.latitude, str(property.id)])
+
+
+async def _index_batch_roaring(redis_client, properties):
+    """Merge a batch into serialized roaring blobs: one GET pipeline, the
+    unions in-process, one SET pipeline. Roaring blobs store the ids
+    directly (no offset), so iteration yields property ids as-is."""
+    batch_bits = defaultdict(BitMap)
+    geo_members = defaultdict(list)
+    for p in properties:
+        for key, pid in _property_keys_and_id(p):
+            batch_bits[key].add(pid)
+        geo_members[geo_key(p.city)].extend([p.longitude, p.latitude, str(p.id)])
+
+    keys = list(batch_bits)
     async with redis_client.pipeline(transaction=False) as pipe:
-        # Atomic bit updates - very fast
-        pipe.setbit(f"bitmap:city:{property.city}", offset, 1)
-        pipe.setbit(f"bitmap:max_guests:{property.max_guests}", offset, 1)
+        for key in keys:
+            pipe.get(key)
+        raw = await pipe.execute()
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for key, data in zip(keys, raw):
+            merged = BitMap.deserialize(data) if data else BitMap()
+            merged |= batch_bits[key]
+            pipe.set(key, merged.serialize())
+        for key, members in geo_members.items():
+            pipe.geoadd(key, members)
+        pipe.incr(CACHE_VERSION_KEY)
+        await pipe.execute()
 
-        # Handle amenities
-        for a in ["has_pool", "has_bar", "smoking_allowed"]:
-            if getattr(property, a):
-                pipe.setbit(f"bitmap:amenity:{a}", offset, 1)
 
-        # GEO is the only "heavy" part
-        pipe.geoadd(f"geo:{property.city}", [property.longitude, property.latitude, str(property.id)])
+async def index_property_to_redis(property: Property):
+    redis_client = get_redis()
 
+    if ROARING:
+        await _index_batch_roaring(redis_client, [property])
+        return
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        _queue_property(pipe, property)
+        pipe.incr(CACHE_VERSION_KEY)
         await pipe.execute()
 
-    # async def index_property_to_redis(property: Property):
-    redis_client = await get_redis()
-
-    # City bitmap
-    key = f"bitmap:city:{property.city}"
-    ba = await bitmap_from_key(key) or bitarray(property.id)
-    while len(ba) < property.id:
-        ba.append(0)
-    ba[property.id - 1] = 1
-    await redis_client.set(key, ba.tobytes())
-
-    # Guest count
-    key = f"bitmap:max_guests:{property.max_guests}"
-    ba = await bitmap_from_key(key) or bitarray(property.id)
-    while len(ba) < property.id:
-        ba.append(0)
-    ba[property.id - 1] = 1
-    await redis_client.set(key, ba.tobytes())
-
-    # Amenities
-    amenity_fields = [c for c in property.__dict__.keys() if property.__dict__[c] is True]
-    for a in amenity_fields:
-        key = f"bitmap:amenity:{a}"
-        ba = await bitmap_from_key(key) or bitarray(property.id)
-        while len(ba) < property.id:
-            ba.append(0)
-        ba[property.id - 1] = 1
-        await redis_client.set(key, ba.tobytes())
-
-    # GEO
-    await redis_client.geoadd(f"geo:{property.city}", [float(property.longitude), float(property.latitude), str(property.id)])
+
+async def index_properties_to_redis(properties):
+    """Index a whole batch of properties in a single pipeline round-trip."""
+    redis_client = get_redis()
+
+    if ROARING:
+        await _index_batch_roaring(redis_client, properties)
+        return
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for p in properties:
+            _queue_property(pipe, p)
+        pipe.incr(CACHE_VERSION_KEY)
+        await pipe.execute()
@@ -1,10 +1,37 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, BigInteger, Index
 
 Base = declarative_base()
 
+# Amenity flags the search API can filter on. The list order defines the bit
+# position of each flag inside Property.amenities (one Redis bitmap each).
+criteria_fields = [
+    "has_pool","has_bar","smoking_allowed","has_wifi","has_gym","has_spa","has_parking",
+    "has_aircon","has_kitchen","has_balcony","pet_friendly","near_beach","near_airport",
+    "family_friendly","romantic","business_ready","breakfast_included","free_cancellation",
+    "early_checkin","late_checkout","wheelchair_accessible","tv","minibar","room_service","non_smoking_rooms"
+]
+
+AMENITY_BITS = {name: 1 << i for i, name in enumerate(criteria_fields)}
+BIT_TO_NAME = {bit: name for name, bit in AMENITY_BITS.items()}
+
+
+def pack_amenities(names) -> int:
+    """Pack an iterable of amenity names into a single bitmask."""
+    mask = 0
+    for name in names:
+        mask |= AMENITY_BITS[name]
+    return mask
+
+
 class Property(Base):
     __tablename__ = "properties"
+    # Covering index for the city + guests filter and a lat/lon index for
+    # the bounding-box geo fallback; amenities is indexed on the column
+    __table_args__ = (
+        Index("ix_props_city_guests", "city", "max_guests"),
+        Index("ix_props_lat_lon", "latitude", "longitude"),
+    )
     id = Column(Integer, primary_key=True)
     name = Column(String)
     city = Column(String)
@@ -12,32 +39,10 @@ class Property(Base):
     longitude = Column(Float)
     max_guests = Column(Integer)
 
-    # Amenities (30+)
-    has_pool = Column(Boolean, default=False)
-    has_bar = Column(Boolean, default=False)
-    smoking_allowed = Column(Boolean, default=False)
-    has_wifi = Column(Boolean, default=False)
-    has_gym = Column(Boolean, default=False)
-    has_spa = Column(Boolean, default=False)
-    has_parking = Column(Boolean, default=False)
-    has_aircon = Column(Boolean, default=False)
-    has_kitchen = Column(Boolean, default=False)
-    has_balcony = Column(Boolean, default=False)
-    pet_friendly = Column(Boolean, default=False)
-    near_beach = Column(Boolean, default=False)
-    near_airport = Column(Boolean, default=False)
-    family_friendly = Column(Boolean, default=False)
-    romantic = Column(Boolean, default=False)
-    business_ready = Column(Boolean, default=False)
-    breakfast_included = Column(Boolean, default=False)
-    free_cancellation = Column(Boolean, default=False)
-    early_checkin = Column(Boolean, default=False)
-    late_checkout = Column(Boolean, default=False)
-    wheelchair_accessible = Column(Boolean, default=False)
-    tv = Column(Boolean, default=False)
-    minibar = Column(Boolean, default=False)
-    room_service = Column(Boolean, default=False)
-    non_smoking_rooms = Column(Boolean, default=False)
+    # All amenity flags packed into one bitmask (bit i = criteria_fields[i]).
+    # An amenity filter is then `amenities & mask = mask` - one ALU op per
+    # row instead of 25 boolean columns.
+    amenities = Column(BigInteger, default=0, index=True)
 
 class Availability(Base):
     __tablename__ = "availability"
@@ -1,7 +1,14 @@
+import os
 from typing import Optional
 
 from redis.asyncio.cluster import ClusterNode, RedisCluster
 
+# Bitmap storage backend:
+#   dense   - plain Redis bitmaps (SETBIT), intersected server-side via BITOP
+#   roaring - one serialized CRoaring blob per key (pyroaring), intersected
+#             client-side; far smaller and faster for sparse sets
+ROARING = os.getenv("BITMAP_BACKEND", "dense") == "roaring"
+
 _redis_cluster: Optional[RedisCluster] = None
 
 
@@ -12,7 +19,10 @@ def remap_docker_ip_to_localhost(address):
     return ("127.0.0.1", address[1])
 
 
-async def get_redis() -> RedisCluster:
+def init_redis() -> RedisCluster:
+    """Create the shared cluster client. Constructing it does no I/O; the
+    startup hook awaits initialize() on it so cluster discovery and
+    connection setup happen before the first request."""
     global _redis_cluster
 
     if _redis_cluster is None:
@@ -34,15 +44,53 @@ async def get_redis() -> RedisCluster:
     return _redis_cluster
 
 
-async def bitmap_from_key(key: str):
-    redis_client = await get_redis()
+def get_redis() -> RedisCluster:
+    """Return the shared client. Synchronous on purpose: a cache hit must not
+    cost a coroutine switch in the request hot path."""
+    if _redis_cluster is None:
+        return init_redis()
+    return _redis_cluster
+
+
+# Bumped on every index write; the search cache embeds it in its keys so
+# cached results are dropped as soon as the data changes
+CACHE_VERSION_KEY = "cache:search:version"
+
+
+# Key builders. The {city} hashtag keeps every per-city key on the same
+# cluster slot so server-side BITOP can combine them.
+def city_key(city: str) -> str:
+    return f"bitmap:{{{city}}}:city"
+
+
+def amenity_key(city: str, amenity: str) -> str:
+    return f"bitmap:{{{city}}}:amenity:{amenity}"
+
 
+def guests_ge_key(city: str, guests: int) -> str:
+    # "accommodates at least {guests}" - precomputed at index time so a
+    # min_guests filter is one key instead of a union of levels
+    return f"bitmap:{{{city}}}:max_guests_ge:{guests}"
+
+
+def geo_key(city: str) -> str:
+    return f"geo:{{{city}}}"
+
+
+# H3 resolution for the precomputed geo-cell bitmaps (res 7 cells are
+# ~2km across - fine-grained enough for 10-25mi search radii)
+H3_RESOLUTION = 7
+
+
+def h3_key(city: str, cell: str) -> str:
+    return f"bitmap:{{{city}}}:h3:{cell}"
+
+
+async def bitmap_from_key(redis_client: RedisCluster, key: str) -> Optional[bytes]:
+    # Return the raw bitmap bytes so callers can run vectorized bit ops on
+    # them directly instead of paying a per-bit bitarray conversion.
     data = await redis_client.get(key)
     if not data:
         return None
 
-    from bitarray import bitarray
-
-    ba = bitarray()
-    ba.frombytes(data)
-    return ba
+    return data
@@ -1,26 +1,37 @@
+import os
 import time
 
-# Global storage for start times
-_timers = {}
+# Timings are only formatted/printed when TIMER_DEBUG is on, so the hot
+# path never builds the f-string in production runs
+DEBUG = os.getenv("TIMER_DEBUG", "1") == "1"
 
 
-def timer_start(label: str):
-    """Starts a timer for a specific label."""
-    _timers[label] = time.perf_counter()
+class Timer:
+    """Context manager that times a block with perf_counter_ns.
 
+    Usage:
 
-def timer_end(label: str) -> float:
-    """Returns the elapsed time for a label. Returns 0 if label not found."""
-    start_time = _timers.get(label)
-    if start_time is None:
-        print(f"Warning: Timer '{label}' was never started.")
-        return 0.0
+        with Timer("Database Insert"):
+            ...
 
-    elapsed = time.perf_counter() - start_time
-    return elapsed
+    Integer nanosecond timestamps avoid float rounding, and keeping the
+    start time on the instance (instead of a shared label->time dict)
+    makes concurrent batches safe.
+    """
 
+    __slots__ = ("label", "start_ns", "elapsed_ns")
 
-def print_timer(label: str):
-    """Convenience method to end a timer and print it immediately."""
-    elapsed = timer_end(label)
-    print(f"⏱️  {label}: {elapsed:.4f} seconds")
+    def __init__(self, label: str):
+        self.label = label
+        self.start_ns = 0
+        self.elapsed_ns = 0
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed_ns = time.perf_counter_ns() - self.start_ns
+        if DEBUG:
+            print(f"⏱️  {self.label}: {self.elapsed_ns / 1e9:.4f} seconds")
+        return False